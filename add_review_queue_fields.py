@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+审核任务队列字段添加脚本 - 为 workflow_status 增加租约字段、待审核状态字段并创建队列查询所需索引
+可重复执行
+"""
+
+import sqlite3
+
+from queue_state import refresh_queue_state
+
+LEASE_COLUMNS = [
+    ('lease_id', 'TEXT'),
+    ('lease_owner', 'TEXT'),
+    ('lease_expires_at', 'DATETIME'),
+    ('lease_review_type', 'TEXT'),
+]
+
+# 待审核状态（冗余字段）：1 表示该类审核仍在队列中；project_created_at 用于按项目创建时间领取
+QUEUE_STATE_COLUMNS = [
+    ('annotation_pending', 'INTEGER DEFAULT 0'),
+    ('ued_pending', 'INTEGER DEFAULT 0'),
+    ('project_created_at', 'DATETIME'),
+]
+
+QUEUE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_workflow_project ON workflow_status (project_id)",
+    "CREATE INDEX IF NOT EXISTS idx_workflow_lease ON workflow_status (lease_id)",
+    "CREATE INDEX IF NOT EXISTS idx_review_project_type ON review_records (project_id, review_type, review_time)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_created ON video_projects (created_at)",
+    # 领取任务：按（待审核, 审核员）定位后按创建时间倒序取第一条，租约过期时间直接在索引中判断
+    "CREATE INDEX IF NOT EXISTS idx_queue_annotation ON workflow_status "
+    "(annotation_pending, annotation_reviewer, project_created_at, lease_expires_at)",
+    "CREATE INDEX IF NOT EXISTS idx_queue_ued ON workflow_status "
+    "(ued_pending, ued_reviewer, project_created_at, lease_expires_at)",
+]
+
+SCREENSHOT_INDEX = "CREATE INDEX IF NOT EXISTS idx_screenshots_project ON screenshots (project_id, review_type)"
+
+def add_review_queue_fields(db_file):
+    """添加租约字段、待审核状态字段和索引"""
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+
+    try:
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(workflow_status)")}
+        for name, column_type in LEASE_COLUMNS + QUEUE_STATE_COLUMNS:
+            if name in existing:
+                print(f"字段 {name} 已存在，跳过")
+            else:
+                cursor.execute(f"ALTER TABLE workflow_status ADD COLUMN {name} {column_type}")
+                print(f"✅ 添加字段 {name}")
+
+        for statement in QUEUE_INDEXES:
+            cursor.execute(statement)
+        print("✅ 创建队列索引")
+
+        # 截图表由单独的脚本创建，存在时按项目建索引（项目列表按结果集取截图）
+        if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'screenshots'").fetchone():
+            cursor.execute(SCREENSHOT_INDEX)
+            print("✅ 创建截图索引")
+
+        refresh_queue_state(conn)
+        print("✅ 计算待审核状态")
+
+        conn.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ 添加字段失败: {e}")
+        return False
+
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    add_review_queue_fields("video_review.db")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口性能测试脚本 - 测量 /api/projects 的响应大小和CPU耗时
+在项目目录下运行（使用当前的 video_review.db）
+"""
+
+import sys
+import time
+
+from start_simple import app
+
+def measure(client, url, encoding=None, rounds=5):
+    """多次请求同一接口，返回 (响应字节数, 平均CPU毫秒)"""
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    size = 0
+    start = time.process_time()
+    for _ in range(rounds):
+        response = client.get(url, headers=headers)
+        size = len(response.get_data())
+    cpu_ms = (time.process_time() - start) * 1000 / rounds
+    return size, cpu_ms
+
+def run_benchmark(rounds=5):
+    """打印各种组合下的响应大小和CPU耗时"""
+    client = app.test_client()
+    cases = [
+        ('全部字段 / 不压缩', '/api/projects', None),
+        ('全部字段 / gzip', '/api/projects', 'gzip'),
+        ('全部字段 / br', '/api/projects', 'br'),
+        ('列表字段 / gzip', '/api/projects?fields=id,material_name_vip,video_url,artwork_video_url,'
+                          'current_stage,annotation_status,ued_status,annotation_reviewer,artwork_person', 'gzip'),
+    ]
+
+    print(f"📊 /api/projects 性能测试（每项 {rounds} 次）:")
+    for name, url, encoding in cases:
+        size, cpu_ms = measure(client, url, encoding, rounds)
+        print(f"   - {name}: {size / 1024:.1f} KB, {cpu_ms:.1f} ms CPU")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
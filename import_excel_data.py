@@ -11,21 +11,41 @@ import os
 from datetime import datetime
 import uuid
 
-def import_excel_to_database(excel_file, db_file):
+from queue_state import refresh_queue_state
+
+# 每处理多少行回调一次进度
+PROGRESS_INTERVAL = 100
+
+def import_excel_to_database(excel_file, db_file, progress_callback=None, raise_errors=False):
     """
     将Excel数据导入到SQLite数据库
+
+    导入在数据库的影子副本中进行，完成后通过SQLite在线备份接口一次性整体替换正式库，
+    导入过程中正在运行的系统始终读到完整的旧数据或完整的新数据。
+
+    progress_callback(processed, total): 可选的进度回调
+    raise_errors: 为True时导入失败会重新抛出异常（供后台任务记录错误信息）
     """
+    shadow_file = f"{db_file}.import-{uuid.uuid4().hex}.tmp"
+    conn = None
     try:
         # 读取Excel文件
         print("正在读取Excel文件...")
         df = pd.read_excel(excel_file)
-        print(f"成功读取 {len(df)} 条记录")
+        total = len(df)
+        print(f"成功读取 {total} 条记录")
+        if progress_callback:
+            progress_callback(0, total)
         
-        # 连接数据库
-        conn = sqlite3.connect(db_file)
+        # 复制正式库到影子库（包含完整表结构）
+        print("创建影子数据库...")
+        live_conn = sqlite3.connect(db_file, timeout=30)
+        conn = sqlite3.connect(shadow_file)
+        live_conn.backup(conn)
+        live_conn.close()
         cursor = conn.cursor()
         
-        # 清空现有数据
+        # 清空影子库中的现有数据
         print("清空现有数据...")
         cursor.execute("DELETE FROM review_records")
         cursor.execute("DELETE FROM workflow_status")
@@ -34,6 +54,7 @@ def import_excel_to_database(excel_file, db_file):
         # 导入数据
         print("开始导入数据...")
         
+        processed = 0
         for index, row in df.iterrows():
             # 生成项目ID
             project_id = str(uuid.uuid4())
@@ -147,10 +168,18 @@ def import_excel_to_database(excel_file, db_file):
                     None,  # screenshot_path
                     datetime.now().isoformat()
                 ))
+            
+            processed += 1
+            if progress_callback and processed % PROGRESS_INTERVAL == 0:
+                progress_callback(processed, total)
         
-        # 提交事务
+        # 计算审核队列的待审核状态
+        refresh_queue_state(conn)
+        
+        # 提交影子库事务
         conn.commit()
-        print("✅ 数据导入完成！")
+        if progress_callback:
+            progress_callback(processed, total)
         
         # 显示统计信息
         cursor.execute("SELECT COUNT(*) FROM video_projects")
@@ -167,12 +196,26 @@ def import_excel_to_database(excel_file, db_file):
         print(f"   - 审核记录: {review_count}")
         print(f"   - 工作流状态: {workflow_count}")
         
-        conn.close()
+        # 用影子库整体替换正式库（单个写事务，读者不会看到中间状态）
+        print("替换正式数据库...")
+        live_conn = sqlite3.connect(db_file, timeout=30)
+        conn.backup(live_conn)
+        live_conn.close()
+        print("✅ 数据导入完成！")
+        
         return True
         
     except Exception as e:
         print(f"❌ 导入失败: {e}")
+        if raise_errors:
+            raise
         return False
+    
+    finally:
+        if conn is not None:
+            conn.close()
+        if os.path.exists(shadow_file):
+            os.remove(shadow_file)
 
 if __name__ == "__main__":
     excel_file = "工作簿3.xlsx"
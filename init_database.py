@@ -7,6 +7,8 @@
 import sqlite3
 import os
 
+from add_review_queue_fields import QUEUE_INDEXES
+
 def init_database():
     """初始化数据库和表结构"""
     db_file = "video_review.db"
@@ -71,6 +73,13 @@ def init_database():
                 ued_reviewer TEXT,
                 artwork_person TEXT,
                 completion_status TEXT,
+                lease_id TEXT,
+                lease_owner TEXT,
+                lease_expires_at DATETIME,
+                lease_review_type TEXT,
+                annotation_pending INTEGER DEFAULT 0,
+                ued_pending INTEGER DEFAULT 0,
+                project_created_at DATETIME,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (project_id) REFERENCES video_projects (id)
@@ -78,6 +87,11 @@ def init_database():
         """)
         print("✅ 创建工作流状态表")
         
+        # 创建索引
+        for statement in QUEUE_INDEXES:
+            cursor.execute(statement)
+        print("✅ 创建索引")
+        
         # 提交事务
         conn.commit()
         print("🎉 数据库初始化完成！")
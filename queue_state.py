@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+审核队列状态 - 维护 workflow_status 上的待审核冗余字段（领取任务时按索引查找）
+"""
+
+# 某类审核的最新状态为空或“未审核”
+PENDING_SQL = """COALESCE((SELECT review_status FROM review_records
+                          WHERE project_id = workflow_status.project_id AND review_type = '{}'
+                          ORDER BY review_time DESC LIMIT 1), '未审核') = '未审核'"""
+
+# 已上传加艺术字视频（UED审核的入队条件）
+HAS_ARTWORK_VIDEO_SQL = """EXISTS (SELECT 1 FROM video_projects
+                                   WHERE id = workflow_status.project_id
+                                     AND artwork_video_url IS NOT NULL AND artwork_video_url != '')"""
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def build_queue_state_sql(conn):
+    """
+    根据当前表结构生成更新语句：
+    - 未执行 add_review_queue_fields.py（没有待审核字段）时返回 None，不维护队列状态
+    - 未执行 add_artwork_video_field.py（没有加艺术字视频字段）时没有项目进入UED审核队列
+    """
+    if 'annotation_pending' not in table_columns(conn, 'workflow_status'):
+        return None
+
+    if 'artwork_video_url' in table_columns(conn, 'video_projects'):
+        ued_pending = f"{PENDING_SQL.format('ued')} AND {HAS_ARTWORK_VIDEO_SQL}"
+    else:
+        ued_pending = '0'
+
+    return f"""
+        UPDATE workflow_status SET
+            annotation_pending = {PENDING_SQL.format('annotation')},
+            ued_pending = {ued_pending},
+            project_created_at = (SELECT created_at FROM video_projects WHERE id = workflow_status.project_id)
+    """
+
+def refresh_queue_state(conn, project_id=None):
+    """重新计算待审核状态（不提交事务）；project_id 为空时更新全部项目"""
+    query = build_queue_state_sql(conn)
+    if query is None:
+        return
+    if project_id is None:
+        conn.execute(query)
+    else:
+        conn.execute(query + " WHERE project_id = ?", (project_id,))
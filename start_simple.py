@@ -5,28 +5,105 @@
 使用Python Flask作为后端
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, g
 import sqlite3
 import os
+import gzip
 import uuid
 from datetime import datetime
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
 
+from queue_state import refresh_queue_state
+from storage import create_storage
+from write_queue import WriteQueue
+
+# 可选依赖：安装后自动启用更快的JSON序列化和brotli压缩
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 app = Flask(__name__)
+app.config['DATABASE'] = 'video_review.db'
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['SCREENSHOT_FOLDER'] = 'screenshots'
+app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 'local')  # 'local' 或 's3'
+app.config['S3_BUCKET'] = os.getenv('S3_BUCKET', '')
+app.config['S3_ENDPOINT_URL'] = os.getenv('S3_ENDPOINT_URL', '')  # MinIO 等S3兼容服务地址，为空时使用AWS
+app.config['S3_REGION'] = os.getenv('S3_REGION', 'us-east-1')
+app.config['PRESIGN_EXPIRES_SECONDS'] = 3600  # 预签名上传/下载地址有效期
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB
+app.config['COMPRESS_MIN_SIZE'] = 1024  # 小于该字节数的响应不压缩
+app.config['COMPRESS_MIMETYPES'] = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+app.config['REVIEW_LEASE_SECONDS'] = 15 * 60  # 领取审核任务的默认租约时长
+app.config['FACETS_CACHE_SECONDS'] = 60  # 筛选项缓存时长（写操作会立即失效）
+app.config['WRITE_BATCH_SIZE'] = 64  # 写队列每批最多提交的写操作数
+app.config['WRITE_BATCH_DELAY'] = 0.01  # 写队列攒批的最长等待时间（秒）
+
+# 创建上传目录（Excel导入的临时文件始终保存在本地）
+os.makedirs(os.path.join('uploads', 'imports'), exist_ok=True)
+
+# 视频和截图的存储后端
+storage = create_storage(app.config)
+
+ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv'}
+
+# Excel导入后台任务（单线程执行，同一时间只运行一个导入）
+import_executor = ThreadPoolExecutor(max_workers=1)
+import_jobs = {}
+import_jobs_lock = threading.Lock()
+
+# 导入在影子库中进行，完成后整体覆盖正式库：导入期间拒绝写请求，开始导入前等待进行中的写请求完成
+write_gate = threading.Condition()
+active_writes = 0
+import_in_progress = False
 
-# 创建上传目录
-os.makedirs('uploads', exist_ok=True)
-os.makedirs('screenshots', exist_ok=True)
+# 筛选项（分面）缓存：查询参数 -> (写入时间, 结果)
+facets_cache = {}
+facets_cache_lock = threading.Lock()
+facets_cache_generation = 0  # 每次失效加一，计算期间发生过写操作的结果不写入缓存
+
+# 数据库写队列：修改类接口的写操作由单独的写线程按批提交
+db_writer = WriteQueue(app.config['DATABASE'],
+                       max_batch=app.config['WRITE_BATCH_SIZE'],
+                       max_delay=app.config['WRITE_BATCH_DELAY'])
 
 def get_db_connection():
     """获取数据库连接"""
-    conn = sqlite3.connect('video_review.db')
+    conn = sqlite3.connect(app.config['DATABASE'])
     conn.row_factory = sqlite3.Row
     return conn
 
+@app.before_request
+def block_writes_during_import():
+    """导入进行中拒绝写请求（409），否则登记为进行中的写请求"""
+    global active_writes
+    if request.method not in ('POST', 'PUT', 'DELETE') or request.endpoint == 'import_excel':
+        return None
+    with write_gate:
+        if import_in_progress:
+            return jsonify({'error': '数据导入中，请稍后再试'}), 409
+        active_writes += 1
+    g.counted_write = True
+
+@app.teardown_request
+def finish_write_request(error=None):
+    """写请求结束，通知等待中的导入任务"""
+    global active_writes
+    if g.pop('counted_write', False):
+        with write_gate:
+            active_writes -= 1
+            write_gate.notify_all()
+
 @app.after_request
 def add_cors_headers(response):
     """为API响应添加简单的CORS头，便于 GitHub Pages 等静态页跨域访问本地服务"""
@@ -35,6 +112,54 @@ def add_cors_headers(response):
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
     return response
 
+def json_response(data, status=200):
+    """快速JSON响应（优先使用orjson，且不做缩进和中文转义）"""
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return Response(body, status=status, mimetype='application/json')
+
+@app.after_request
+def compress_response(response):
+    """按 Accept-Encoding 对较大的文本响应做 brotli/gzip 压缩"""
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+    
+    body = response.get_data()
+    if len(body) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif accept['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    return response
+
+def invalidate_facets_cache():
+    """清空筛选项缓存"""
+    global facets_cache_generation
+    with facets_cache_lock:
+        facets_cache.clear()
+        facets_cache_generation += 1
+
+@app.after_request
+def invalidate_facets_on_write(response):
+    """写操作成功后清空筛选项缓存"""
+    if request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400:
+        invalidate_facets_cache()
+    return response
+
 @app.route('/')
 def index():
     """主页"""
@@ -45,36 +170,35 @@ def test_screenshot_display():
     """测试截图显示页面"""
     return send_from_directory('.', 'test_screenshot_display.html')
 
-@app.route('/api/projects')
-def get_projects():
-    """获取项目列表"""
-    conn = get_db_connection()
+# 某类审核的最新状态（关联 vp.id）
+LATEST_REVIEW_STATUS_SQL = "(SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = '{}' ORDER BY review_time DESC LIMIT 1)"
+
+def build_project_conditions(args, exclude=()):
+    """根据查询参数生成项目筛选条件，exclude 中的参数不参与筛选（用于分面计数）"""
+    def get(name):
+        return None if name in exclude else args.get(name)
     
     # 获取查询参数
-    status = request.args.get('status')
-    stage = request.args.get('stage')
-    reviewer = request.args.get('reviewer')
-    artwork_person = request.args.get('artworkPerson')
-    brand = request.args.get('brand')
-    provide_date_start = request.args.get('provideDateStart')
-    provide_date_end = request.args.get('provideDateEnd')
-    selection_date_start = request.args.get('selectionDateStart')
-    selection_date_end = request.args.get('selectionDateEnd')
-    product_id = request.args.get('productId')
-    annotation_status = request.args.get('annotationStatus')
-    ued_status = request.args.get('uedStatus')
-    
-    query = """
-        SELECT vp.*, ws.current_stage, ws.completion_status, ws.annotation_reviewer, ws.ued_reviewer, ws.artwork_person,
-               (SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = 'annotation' ORDER BY review_time DESC LIMIT 1) as annotation_status,
-               (SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = 'ued' ORDER BY review_time DESC LIMIT 1) as ued_status
-        FROM video_projects vp
-        LEFT JOIN workflow_status ws ON vp.id = ws.project_id
-    """
+    project_id = get('id')  # 单个项目（用于前端局部刷新一行）
+    status = get('status')
+    stage = get('stage')
+    reviewer = get('reviewer')
+    artwork_person = get('artworkPerson')
+    brand = get('brand')
+    provide_date_start = get('provideDateStart')
+    provide_date_end = get('provideDateEnd')
+    selection_date_start = get('selectionDateStart')
+    selection_date_end = get('selectionDateEnd')
+    product_id = get('productId')
+    annotation_status = get('annotationStatus')
+    ued_status = get('uedStatus')
     
     conditions = []
     params = []
     
+    if project_id:
+        conditions.append('vp.id = ?')
+        params.append(project_id)
     if status:
         conditions.append('ws.completion_status = ?')
         params.append(status)
@@ -114,53 +238,158 @@ def get_projects():
     if product_id:
         conditions.append('vp.product_id LIKE ?')
         params.append(f'%{product_id}%')
+    # 没有审核记录视为“未审核”
     if annotation_status:
-        if annotation_status == '未审核':
-            conditions.append('(SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = "annotation" ORDER BY review_time DESC LIMIT 1) IS NULL')
-        else:
-            conditions.append('(SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = "annotation" ORDER BY review_time DESC LIMIT 1) = ?')
-            params.append(annotation_status)
+        conditions.append(f"COALESCE({LATEST_REVIEW_STATUS_SQL.format('annotation')}, '未审核') = ?")
+        params.append(annotation_status)
     if ued_status:
-        if ued_status == '未审核':
-            conditions.append('(SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = "ued" ORDER BY review_time DESC LIMIT 1) IS NULL')
-        else:
-            conditions.append('(SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = "ued" ORDER BY review_time DESC LIMIT 1) = ?')
-            params.append(ued_status)
+        conditions.append(f"COALESCE({LATEST_REVIEW_STATUS_SQL.format('ued')}, '未审核') = ?")
+        params.append(ued_status)
+    
+    return conditions, params
+
+@app.route('/api/projects')
+def get_projects():
+    """获取项目列表
+
+    fields: 可选，逗号分隔的返回字段列表（id 始终返回），例如 fields=id,material_name_vip,annotation_status
+    """
+    conn = get_db_connection()
+    # 直接使用元组构建结果，避免逐行 sqlite3.Row -> dict 的复制
+    conn.row_factory = None
+    
+    query = """
+        SELECT vp.*, ws.current_stage, ws.completion_status, ws.annotation_reviewer, ws.ued_reviewer, ws.artwork_person,
+               (SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = 'annotation' ORDER BY review_time DESC LIMIT 1) as annotation_status,
+               (SELECT review_status FROM review_records WHERE project_id = vp.id AND review_type = 'ued' ORDER BY review_time DESC LIMIT 1) as ued_status
+        FROM video_projects vp
+        LEFT JOIN workflow_status ws ON vp.id = ws.project_id
+    """
     
-    if conditions:
-        query += ' WHERE ' + ' AND '.join(conditions)
+    conditions, params = build_project_conditions(request.args)
+    where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
     
-    query += ' ORDER BY vp.created_at DESC'
+    query += where + ' ORDER BY vp.created_at DESC'
     
-    projects = conn.execute(query, params).fetchall()
+    cursor = conn.execute(query, params)
+    columns = [d[0] for d in cursor.description]
+    
+    # 字段投影
+    screenshot_fields = {'annotation_screenshots': 'annotation', 'ued_screenshots': 'ued'}
+    fields = request.args.get('fields')
+    if fields:
+        requested = {f.strip() for f in fields.split(',') if f.strip()}
+        unknown = requested - set(columns) - set(screenshot_fields)
+        if unknown:
+            conn.close()
+            return jsonify({'error': f'未知字段: {", ".join(sorted(unknown))}'}), 400
+        requested.add('id')
+        indexes = [i for i, c in enumerate(columns) if c in requested]
+        screenshot_fields = {f: t for f, t in screenshot_fields.items() if f in requested}
+    else:
+        indexes = None
+    
+    keys = columns if indexes is None else [columns[i] for i in indexes]
+    id_index = columns.index('id')
+    rows = cursor.fetchall()
+    
+    # 一次查询取回结果集内项目的截图，按项目分组（替代每个项目两次查询）
+    screenshots = {}
+    if screenshot_fields and rows:
+        screenshot_query = """
+            SELECT project_id, review_type, screenshot_path FROM screenshots
+            WHERE review_type IN ('annotation', 'ued')
+        """
+        if conditions:
+            screenshot_query += f"""
+              AND project_id IN (SELECT vp.id FROM video_projects vp
+                                 LEFT JOIN workflow_status ws ON vp.id = ws.project_id {where})
+            """
+        for project_id, review_type, screenshot_path in conn.execute(
+                screenshot_query + ' ORDER BY created_at DESC', params):
+            screenshots.setdefault((project_id, review_type), []).append({'screenshot_path': screenshot_path})
     
-    # 为每个项目获取截图数据
     result = []
-    for project in projects:
-        project_dict = dict(project)
-        
-        # 获取标注审核截图
-        annotation_screenshots = conn.execute("""
-            SELECT screenshot_path FROM screenshots 
-            WHERE project_id = ? AND review_type = 'annotation'
-            ORDER BY created_at DESC
-        """, (project_dict['id'],)).fetchall()
-        
-        # 获取UED审核截图
-        ued_screenshots = conn.execute("""
-            SELECT screenshot_path FROM screenshots 
-            WHERE project_id = ? AND review_type = 'ued'
-            ORDER BY created_at DESC
-        """, (project_dict['id'],)).fetchall()
-        
-        project_dict['annotation_screenshots'] = [dict(row) for row in annotation_screenshots]
-        project_dict['ued_screenshots'] = [dict(row) for row in ued_screenshots]
-        
+    for row in rows:
+        project_dict = dict(zip(keys, row if indexes is None else [row[i] for i in indexes]))
+        project_id = row[id_index]
+        for field, review_type in screenshot_fields.items():
+            project_dict[field] = screenshots.get((project_id, review_type), [])
         result.append(project_dict)
     
     conn.close()
     
-    return jsonify(result)
+    return json_response(result)
+
+# 可筛选字段 -> 分组表达式（键与 /api/projects 的查询参数一致）
+FACET_COLUMNS = {
+    'status': 'ws.completion_status',
+    'stage': 'ws.current_stage',
+    'artworkPerson': 'ws.artwork_person',
+    'brand': 'vp.brand_name',
+    'annotationStatus': f"COALESCE({LATEST_REVIEW_STATUS_SQL.format('annotation')}, '未审核')",
+    'uedStatus': f"COALESCE({LATEST_REVIEW_STATUS_SQL.format('ued')}, '未审核')",
+}
+
+# “审核员”筛选匹配任一人员字段
+REVIEWER_FACET_COLUMNS = ['ws.annotation_reviewer', 'ws.ued_reviewer', 'ws.artwork_person']
+
+def compute_facets(conn, args):
+    """分组统计各筛选字段的取值和数量，每个字段的计数应用除自身外的其他筛选条件"""
+    base = """
+        FROM video_projects vp
+        LEFT JOIN workflow_status ws ON vp.id = ws.project_id
+    """
+    facets = {}
+    
+    for name, expression in FACET_COLUMNS.items():
+        conditions, params = build_project_conditions(args, exclude=(name,))
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        rows = conn.execute(f"""
+            SELECT value, COUNT(*) AS count FROM (SELECT {expression} AS value {base} {where})
+            WHERE value IS NOT NULL AND value != ''
+            GROUP BY value ORDER BY count DESC, value
+        """, params).fetchall()
+        facets[name] = [{'value': row['value'], 'count': row['count']} for row in rows]
+    
+    # 同一项目多个字段为同一人时只计一次
+    conditions, params = build_project_conditions(args, exclude=('reviewer',))
+    where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    union = ' UNION ALL '.join(f'SELECT vp.id AS id, {column} AS value {base} {where}' for column in REVIEWER_FACET_COLUMNS)
+    rows = conn.execute(f"""
+        SELECT value, COUNT(DISTINCT id) AS count FROM ({union})
+        WHERE value IS NOT NULL AND value != ''
+        GROUP BY value ORDER BY count DESC, value
+    """, params * len(REVIEWER_FACET_COLUMNS)).fetchall()
+    facets['reviewer'] = [{'value': row['value'], 'count': row['count']} for row in rows]
+    
+    return facets
+
+@app.route('/api/facets')
+def get_facets():
+    """获取筛选项（各字段的取值及数量，支持与 /api/projects 相同的筛选参数）"""
+    key = tuple(sorted(request.args.items(multi=True)))
+    now = time.time()
+    
+    with facets_cache_lock:
+        cached = facets_cache.get(key)
+        generation = facets_cache_generation
+    if cached and now - cached[0] < app.config['FACETS_CACHE_SECONDS']:
+        return json_response(cached[1])
+    
+    conn = get_db_connection()
+    facets = compute_facets(conn, request.args)
+    conn.close()
+    
+    with facets_cache_lock:
+        # 计算期间缓存已失效（有写操作），结果可能是写入前的数据，不缓存
+        if generation == facets_cache_generation:
+            # 防止筛选组合过多时缓存无限增长
+            if len(facets_cache) >= 256:
+                facets_cache.clear()
+            facets_cache[key] = (now, facets)
+    
+    return json_response(facets)
 
 @app.route('/api/projects/<project_id>')
 def get_project(project_id):
@@ -232,29 +461,30 @@ def submit_review():
     review_status = data.get('reviewStatus')
     problem_description = data.get('problemDescription')
     
-    conn = get_db_connection()
-    
-    # 插入审核记录
     review_id = str(uuid.uuid4())
-    conn.execute("""
-        INSERT INTO review_records (id, project_id, review_type, reviewer_name, review_status, problem_description)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (review_id, project_id, review_type, reviewer_name, review_status, problem_description))
     
-    # 更新工作流状态
-    if review_type == 'annotation':
-        conn.execute("""
-            UPDATE workflow_status SET current_stage = ?, annotation_reviewer = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE project_id = ?
-        """, ('ued_review', reviewer_name, project_id))
-    elif review_type == 'ued':
+    def write(conn):
+        # 插入审核记录
         conn.execute("""
-            UPDATE workflow_status SET current_stage = ?, ued_reviewer = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE project_id = ?
-        """, ('artwork', reviewer_name, project_id))
+            INSERT INTO review_records (id, project_id, review_type, reviewer_name, review_status, problem_description)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (review_id, project_id, review_type, reviewer_name, review_status, problem_description))
+        
+        # 更新工作流状态
+        if review_type == 'annotation':
+            conn.execute("""
+                UPDATE workflow_status SET current_stage = ?, annotation_reviewer = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE project_id = ?
+            """, ('ued_review', reviewer_name, project_id))
+        elif review_type == 'ued':
+            conn.execute("""
+                UPDATE workflow_status SET current_stage = ?, ued_reviewer = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE project_id = ?
+            """, ('artwork', reviewer_name, project_id))
+        
+        refresh_queue_state(conn, project_id)
     
-    conn.commit()
-    conn.close()
+    db_writer.submit(write)
     
     return jsonify({'id': review_id, 'message': '审核记录已保存'})
 
@@ -267,8 +497,6 @@ def update_workflow(project_id):
     artwork_person = data.get('artworkPerson')
     completion_status = data.get('completionStatus')
     
-    conn = get_db_connection()
-    
     update_parts = []
     params = []
     
@@ -287,45 +515,74 @@ def update_workflow(project_id):
     
     query = 'UPDATE workflow_status SET ' + ', '.join(update_parts) + ' WHERE project_id = ?'
     
-    conn.execute(query, params)
-    conn.commit()
-    conn.close()
+    db_writer.submit(lambda conn: conn.execute(query, params))
     
     return jsonify({'message': '工作流状态已更新'})
 
+def make_screenshot_filename(video_id, review_type):
+    """生成截图文件名（带随机后缀，避免同一秒内的多张截图重名）"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return secure_filename(f"screenshot_{video_id}_{review_type}_{timestamp}_{uuid.uuid4().hex[:8]}.png")
+
+@app.route('/api/save-screenshot/presign', methods=['POST'])
+def presign_screenshot():
+    """获取截图直传地址（仅S3存储）；上传完成后以 filename 调用 /api/save-screenshot 记录"""
+    if not storage.supports_presign:
+        return jsonify({'error': '当前存储后端不支持直传'}), 501
+    
+    data = request.get_json() or {}
+    video_id = data.get('videoId')
+    review_type = data.get('reviewType')
+    
+    if not video_id or not review_type:
+        return jsonify({'error': '缺少必要参数'}), 400
+    
+    filename = make_screenshot_filename(video_id, review_type)
+    expires = app.config['PRESIGN_EXPIRES_SECONDS']
+    return jsonify({
+        'filename': filename,
+        'upload_url': storage.presign_put('screenshots', filename, 'image/png', expires),
+        'method': 'PUT',
+        'headers': {'Content-Type': 'image/png'},
+        'expires_in': expires
+    })
+
 @app.route('/api/save-screenshot', methods=['POST'])
 def save_screenshot():
-    """保存截图"""
+    """保存截图（screenshotData 为base64数据；已直传的截图只需传 filename）"""
     try:
         video_id = request.form.get('videoId')
         review_type = request.form.get('reviewType')  # 'annotation' 或 'ued'
         screenshot_data = request.form.get('screenshotData')  # base64数据
+        filename = request.form.get('filename')  # 已通过预签名地址上传的文件名
         
-        if not video_id or not review_type or not screenshot_data:
+        if not video_id or not review_type or not (screenshot_data or filename):
             return jsonify({'error': '缺少必要参数'}), 400
         
-        # 生成截图文件名
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"screenshot_{video_id}_{review_type}_{timestamp}.png"
-        file_path = os.path.join('screenshots', filename)
-        
-        # 保存base64图片数据
-        import base64
-        if screenshot_data.startswith('data:image'):
-            screenshot_data = screenshot_data.split(',')[1]
-        
-        with open(file_path, 'wb') as f:
-            f.write(base64.b64decode(screenshot_data))
+        if screenshot_data:
+            # 保存base64图片数据
+            import base64
+            import io
+            if screenshot_data.startswith('data:image'):
+                screenshot_data = screenshot_data.split(',')[1]
+            
+            filename = make_screenshot_filename(video_id, review_type)
+            storage.save('screenshots', filename, io.BytesIO(base64.b64decode(screenshot_data)), 'image/png')
+        elif not storage.supports_presign:
+            # 本地存储不支持直传，只记录文件名会把 screenshots/ 中任意已有文件关联到项目
+            return jsonify({'error': '当前存储后端不支持直传，请上传截图数据'}), 400
+        else:
+            prefix = secure_filename(f"screenshot_{video_id}_{review_type}_")
+            if secure_filename(filename) != filename or not filename.startswith(prefix):
+                return jsonify({'error': '截图文件名无效'}), 400
+            if not storage.exists('screenshots', filename):
+                return jsonify({'error': '截图文件尚未上传'}), 400
         
         # 保存到数据库
-        conn = get_db_connection()
-        conn.execute("""
+        db_writer.submit(lambda conn: conn.execute("""
             INSERT INTO screenshots (id, project_id, review_type, screenshot_path, created_at)
             VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """, (str(uuid.uuid4()), video_id, review_type, f"/screenshots/{filename}"))
-        
-        conn.commit()
-        conn.close()
+        """, (str(uuid.uuid4()), video_id, review_type, f"/screenshots/{filename}")))
         
         return jsonify({
             'message': '截图保存成功',
@@ -335,6 +592,26 @@ def save_screenshot():
     except Exception as e:
         return jsonify({'error': f'保存截图失败: {str(e)}'}), 500
 
+def insert_review_record(conn, video_id, status_type, reviewer_name, new_status, review_comment):
+    """插入审核记录并同步工作流中的审核员和待审核状态（不提交事务）"""
+    conn.execute("""
+        INSERT INTO review_records (id, project_id, review_type, reviewer_name, review_status, problem_description, review_time)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    """, (str(uuid.uuid4()), video_id, status_type, reviewer_name, new_status, review_comment))
+    
+    if status_type == 'annotation':
+        conn.execute("""
+            UPDATE workflow_status SET annotation_reviewer = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE project_id = ?
+        """, (reviewer_name, video_id))
+    elif status_type == 'ued':
+        conn.execute("""
+            UPDATE workflow_status SET ued_reviewer = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE project_id = ?
+        """, (reviewer_name, video_id))
+    
+    refresh_queue_state(conn, video_id)
+
 @app.route('/api/toggle-status', methods=['POST'])
 def toggle_status():
     """切换验收状态"""
@@ -346,34 +623,14 @@ def toggle_status():
     review_comment = data.get('comment', '')  # 审核意见
     reviewer_name = data.get('reviewer', '未分配')  # 审核员姓名
     
-    conn = get_db_connection()
-    
     try:
-        # 更新审核记录
-        conn.execute("""
-            INSERT INTO review_records (id, project_id, review_type, reviewer_name, review_status, problem_description, review_time)
-            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """, (str(uuid.uuid4()), video_id, status_type, reviewer_name, new_status, review_comment))
-        
-        # 更新工作流状态
-        if status_type == 'annotation':
-            conn.execute("""
-                UPDATE workflow_status SET annotation_reviewer = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE project_id = ?
-            """, (reviewer_name, video_id))
-        elif status_type == 'ued':
-            conn.execute("""
-                UPDATE workflow_status SET ued_reviewer = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE project_id = ?
-            """, (reviewer_name, video_id))
-        
-        conn.commit()
-        conn.close()
+        # 插入审核记录并更新工作流状态
+        db_writer.submit(lambda conn: insert_review_record(
+            conn, video_id, status_type, reviewer_name, new_status, review_comment))
         
         return jsonify({'message': '状态已更新'})
         
     except Exception as e:
-        conn.close()
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/update-reviewer', methods=['POST'])
@@ -384,22 +641,16 @@ def update_reviewer():
     video_id = data.get('videoId')
     new_reviewer = data.get('reviewer')
     
-    conn = get_db_connection()
-    
     try:
         # 更新工作流状态中的审核员
-        conn.execute("""
+        db_writer.submit(lambda conn: conn.execute("""
             UPDATE workflow_status SET annotation_reviewer = ?, updated_at = CURRENT_TIMESTAMP
             WHERE project_id = ?
-        """, (new_reviewer, video_id))
-        
-        conn.commit()
-        conn.close()
+        """, (new_reviewer, video_id)))
         
         return jsonify({'message': '审核员已更新'})
         
     except Exception as e:
-        conn.close()
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/update-artwork-person', methods=['POST'])
@@ -410,66 +661,261 @@ def update_artwork_person():
     video_id = data.get('videoId')
     new_person = data.get('artworkPerson')
     
+    try:
+        # 更新工作流状态中的加艺术字人员
+        db_writer.submit(lambda conn: conn.execute("""
+            UPDATE workflow_status SET artwork_person = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE project_id = ?
+        """, (new_person, video_id)))
+        
+        return jsonify({'message': '加艺术字人员已更新'})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 各审核类型的队列字段：待审核状态字段和对应的审核员字段
+QUEUE_REVIEW_TYPES = {
+    'annotation': ('annotation_pending', 'annotation_reviewer'),
+    'ued': ('ued_pending', 'ued_reviewer'),
+}
+
+@app.route('/api/queue/claim', methods=['POST'])
+def claim_review_task():
+    """领取下一个待审核任务（带过期时间的租约）"""
+    data = request.get_json()
+    
+    review_type = data.get('reviewType')  # 'annotation' 或 'ued'
+    reviewer_name = data.get('reviewer')
+    
+    if review_type not in QUEUE_REVIEW_TYPES or not reviewer_name:
+        return jsonify({'error': '缺少必要参数'}), 400
+    
+    try:
+        lease_seconds = int(data.get('leaseSeconds') or app.config['REVIEW_LEASE_SECONDS'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'leaseSeconds 必须是整数'}), 400
+    lease_seconds = max(30, min(lease_seconds, 3600))
+    
+    pending_column, reviewer_column = QUEUE_REVIEW_TYPES[review_type]
     conn = get_db_connection()
     
     try:
-        # 更新工作流状态中的加艺术字人员
+        # 立即获取写锁，保证“查找+加租约”原子执行，两个审核员不会领到同一任务
+        conn.execute('BEGIN IMMEDIATE')
+        
+        # 分配给本人或未分配（空字符串/NULL）各走一次索引查找，取其中最新的未被他人租用的项目
+        candidates = []
+        for reviewer in (reviewer_name, '', None):
+            row = conn.execute(f"""
+                SELECT project_id, project_created_at FROM workflow_status
+                WHERE {pending_column} = 1 AND {reviewer_column} IS ?
+                  AND (lease_expires_at IS NULL OR lease_expires_at < datetime('now'))
+                ORDER BY project_created_at DESC
+                LIMIT 1
+            """, (reviewer,)).fetchone()
+            if row:
+                candidates.append(row)
+        task = max(candidates, key=lambda row: row['project_created_at'] or '', default=None)
+        
+        if not task:
+            conn.rollback()
+            conn.close()
+            return jsonify({'error': '暂无待审核任务'}), 404
+        
+        lease_id = str(uuid.uuid4())
         conn.execute("""
-            UPDATE workflow_status SET artwork_person = ?, updated_at = CURRENT_TIMESTAMP
+            UPDATE workflow_status SET lease_id = ?, lease_owner = ?, lease_review_type = ?,
+                lease_expires_at = datetime('now', ?)
             WHERE project_id = ?
-        """, (new_person, video_id))
+        """, (lease_id, reviewer_name, review_type, f'+{lease_seconds} seconds', task['project_id']))
+        conn.commit()
         
+        project = conn.execute("""
+            SELECT vp.*, ws.current_stage, ws.completion_status, ws.annotation_reviewer, ws.ued_reviewer, ws.artwork_person,
+                   ws.lease_expires_at
+            FROM video_projects vp
+            LEFT JOIN workflow_status ws ON vp.id = ws.project_id
+            WHERE vp.id = ?
+        """, (task['project_id'],)).fetchone()
+        conn.close()
+        
+        return jsonify({
+            'lease_id': lease_id,
+            'lease_expires_at': project['lease_expires_at'],
+            'review_type': review_type,
+            'project': dict(project)
+        })
+        
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/queue/release', methods=['POST'])
+def release_review_task():
+    """释放已领取的审核任务"""
+    data = request.get_json()
+    
+    lease_id = data.get('leaseId')
+    if not lease_id:
+        return jsonify({'error': '缺少租约ID'}), 400
+    
+    conn = get_db_connection()
+    
+    try:
+        cursor = conn.execute("""
+            UPDATE workflow_status SET lease_id = NULL, lease_owner = NULL, lease_expires_at = NULL,
+                lease_review_type = NULL
+            WHERE lease_id = ?
+        """, (lease_id,))
         conn.commit()
         conn.close()
         
-        return jsonify({'message': '加艺术字人员已更新'})
+        if cursor.rowcount == 0:
+            return jsonify({'error': '租约不存在或已被他人领取'}), 409
+        return jsonify({'message': '任务已释放'})
         
     except Exception as e:
         conn.close()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload-artwork-video', methods=['POST'])
-def upload_artwork_video():
-    """上传加艺术字视频"""
+@app.route('/api/queue/complete', methods=['POST'])
+def complete_review_task():
+    """提交已领取任务的审核结果并释放租约"""
+    data = request.get_json()
+    
+    lease_id = data.get('leaseId')
+    review_status = data.get('reviewStatus')  # '可用' 或 '不可用'
+    review_comment = data.get('comment', '')
+    review_type = data.get('reviewType')  # 可选，须与领取时的审核类型一致
+    
+    if not lease_id or review_status not in ('可用', '不可用'):
+        return jsonify({'error': '缺少必要参数'}), 400
+    if review_type is not None and review_type not in QUEUE_REVIEW_TYPES:
+        return jsonify({'error': '审核类型无效'}), 400
+    
+    conn = get_db_connection()
+    
     try:
-        # 检查是否有文件
-        if 'videoFile' not in request.files:
-            return jsonify({'error': '没有选择文件'}), 400
+        conn.execute('BEGIN IMMEDIATE')
         
-        file = request.files['videoFile']
-        if file.filename == '':
-            return jsonify({'error': '没有选择文件'}), 400
+        lease = conn.execute("""
+            SELECT project_id, lease_owner, lease_review_type FROM workflow_status
+            WHERE lease_id = ? AND lease_expires_at >= datetime('now')
+        """, (lease_id,)).fetchone()
+        
+        if not lease:
+            conn.rollback()
+            conn.close()
+            return jsonify({'error': '租约不存在或已过期'}), 409
+        
+        if review_type is not None and review_type != lease['lease_review_type']:
+            conn.rollback()
+            conn.close()
+            return jsonify({'error': '审核类型与领取时不一致'}), 409
+        
+        insert_review_record(conn, lease['project_id'], lease['lease_review_type'], lease['lease_owner'],
+                             review_status, review_comment)
+        conn.execute("""
+            UPDATE workflow_status SET lease_id = NULL, lease_owner = NULL, lease_expires_at = NULL,
+                lease_review_type = NULL
+            WHERE project_id = ?
+        """, (lease['project_id'],))
+        
+        conn.commit()
+        conn.close()
+        
+        return jsonify({'message': '审核结果已保存', 'project_id': lease['project_id']})
         
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'error': str(e)}), 500
+
+def is_allowed_video(filename):
+    """检查视频文件扩展名"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_VIDEO_EXTENSIONS
+
+def artwork_filename_prefix(video_id):
+    """加艺术字视频文件名前缀（绑定项目，完成直传时校验）"""
+    return secure_filename(f"artwork_{video_id}") + '_'
+
+def make_upload_filename(video_id, original_filename):
+    """生成安全的文件名：项目前缀 + 时间戳 + 随机后缀（避免同一秒内同名文件互相覆盖）"""
+    name, ext = original_filename.rsplit('.', 1)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    stem = secure_filename(name)
+    suffix = f"_{stem}" if stem else ''
+    return f"{artwork_filename_prefix(video_id)}{timestamp}_{uuid.uuid4().hex[:8]}{suffix}.{ext.lower()}"
+
+@app.route('/api/upload-artwork-video/presign', methods=['POST'])
+def presign_artwork_video():
+    """获取加艺术字视频直传地址（仅S3存储）；上传完成后以 filename 调用 /api/upload-artwork-video 记录"""
+    if not storage.supports_presign:
+        return jsonify({'error': '当前存储后端不支持直传'}), 501
+    
+    data = request.get_json() or {}
+    original_filename = data.get('filename', '')
+    content_type = data.get('contentType') or 'application/octet-stream'
+    
+    if not data.get('videoId'):
+        return jsonify({'error': '缺少视频ID'}), 400
+    if not is_allowed_video(original_filename):
+        return jsonify({'error': '不支持的文件格式，请上传 MP4、AVI、MOV 等视频文件'}), 400
+    
+    filename = make_upload_filename(data['videoId'], original_filename)
+    expires = app.config['PRESIGN_EXPIRES_SECONDS']
+    return jsonify({
+        'filename': filename,
+        'upload_url': storage.presign_put('uploads', filename, content_type, expires),
+        'method': 'PUT',
+        'headers': {'Content-Type': content_type},
+        'expires_in': expires
+    })
+
+@app.route('/api/upload-artwork-video', methods=['POST'])
+def upload_artwork_video():
+    """上传加艺术字视频（multipart 上传 videoFile；已直传的视频只需传 filename）"""
+    try:
         # 获取其他参数
         video_id = request.form.get('videoId')
         description = request.form.get('description', '')
+        file = request.files.get('videoFile')
+        
+        if file is not None:
+            if file.filename == '':
+                return jsonify({'error': '没有选择文件'}), 400
+        elif not request.form.get('filename'):
+            return jsonify({'error': '没有选择文件'}), 400
         
         if not video_id:
             return jsonify({'error': '缺少视频ID'}), 400
         
-        # 检查文件类型
-        allowed_extensions = {'mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv'}
-        if '.' not in file.filename or file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
-            return jsonify({'error': '不支持的文件格式，请上传 MP4、AVI、MOV 等视频文件'}), 400
-        
-        # 生成安全的文件名
-        filename = secure_filename(file.filename)
-        # 添加时间戳避免重名
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        name, ext = os.path.splitext(filename)
-        filename = f"{name}_{timestamp}{ext}"
-        
-        # 保存文件
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        if file is not None:
+            # 检查文件类型
+            if not is_allowed_video(file.filename):
+                return jsonify({'error': '不支持的文件格式，请上传 MP4、AVI、MOV 等视频文件'}), 400
+            
+            # 保存文件
+            filename = make_upload_filename(video_id, file.filename)
+            storage.save('uploads', filename, file.stream, file.mimetype)
+        elif not storage.supports_presign:
+            # 本地存储不支持直传，只记录文件名会把 uploads/ 中任意已有文件关联到项目
+            return jsonify({'error': '当前存储后端不支持直传，请上传视频文件'}), 400
+        else:
+            # 客户端已通过预签名地址上传，这里只记录元数据
+            filename = request.form.get('filename')
+            if (secure_filename(filename) != filename or not is_allowed_video(filename)
+                    or not filename.startswith(artwork_filename_prefix(video_id))):
+                return jsonify({'error': '文件名无效'}), 400
+            if not storage.exists('uploads', filename):
+                return jsonify({'error': '视频文件尚未上传'}), 400
         
         # 生成访问URL
         video_url = f"/uploads/{filename}"
         
         # 更新数据库
-        conn = get_db_connection()
-        
-        try:
+        def write(conn):
             # 更新视频项目的加艺术字视频URL
             conn.execute("""
                 UPDATE video_projects SET artwork_video_url = ? WHERE id = ?
@@ -483,8 +929,11 @@ def upload_artwork_video():
                 WHERE project_id = ?
             """, (video_id,))
             
-            conn.commit()
-            conn.close()
+            # 有了加艺术字视频后进入UED审核队列
+            refresh_queue_state(conn, video_id)
+        
+        try:
+            db_writer.submit(write)
             
             return jsonify({
                 'message': '视频上传成功',
@@ -493,24 +942,120 @@ def upload_artwork_video():
             })
             
         except Exception as e:
-            conn.close()
             # 删除已上传的文件
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            storage.delete('uploads', filename)
             return jsonify({'error': f'数据库更新失败: {str(e)}'}), 500
         
     except Exception as e:
         return jsonify({'error': f'上传失败: {str(e)}'}), 500
 
+def run_import_job(job_id, excel_path):
+    """后台执行Excel导入任务"""
+    global import_in_progress
+    from import_excel_data import import_excel_to_database
+    
+    start = time.time()
+    with import_jobs_lock:
+        import_jobs[job_id]['status'] = 'running'
+        import_jobs[job_id]['started_at'] = datetime.now().isoformat()
+    
+    # 停止接收写请求，并等待已开始的写请求提交，保证影子库快照包含它们、导入期间的写入不会被覆盖
+    with write_gate:
+        import_in_progress = True
+        while active_writes:
+            write_gate.wait()
+    
+    def on_progress(processed, total):
+        elapsed = time.time() - start
+        with import_jobs_lock:
+            job = import_jobs[job_id]
+            job['processed_rows'] = processed
+            job['total_rows'] = total
+            job['rows_per_second'] = round(processed / elapsed, 2) if elapsed > 0 else 0
+    
+    try:
+        import_excel_to_database(excel_path, app.config['DATABASE'], progress_callback=on_progress, raise_errors=True)
+        status = 'succeeded'
+        error = None
+    except Exception as e:
+        status = 'failed'
+        error = str(e)
+    finally:
+        with write_gate:
+            import_in_progress = False
+        if os.path.exists(excel_path):
+            os.remove(excel_path)
+    
+    if status == 'succeeded':
+        invalidate_facets_cache()
+    
+    with import_jobs_lock:
+        job = import_jobs[job_id]
+        job['status'] = status
+        job['finished_at'] = datetime.now().isoformat()
+        job['elapsed_seconds'] = round(time.time() - start, 2)
+        if error:
+            job['errors'].append(error)
+
+@app.route('/api/import-excel', methods=['POST'])
+def import_excel():
+    """上传Excel并在后台导入"""
+    if 'excelFile' not in request.files:
+        return jsonify({'error': '没有选择文件'}), 400
+    
+    file = request.files['excelFile']
+    if file.filename == '':
+        return jsonify({'error': '没有选择文件'}), 400
+    
+    allowed_extensions = {'xlsx', 'xls'}
+    if '.' not in file.filename or file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
+        return jsonify({'error': '不支持的文件格式，请上传 XLSX 或 XLS 文件'}), 400
+    
+    job_id = str(uuid.uuid4())
+    filename = f"{job_id}_{secure_filename(file.filename)}"
+    excel_path = os.path.join(app.config['UPLOAD_FOLDER'], 'imports', filename)
+    file.save(excel_path)
+    
+    with import_jobs_lock:
+        import_jobs[job_id] = {
+            'id': job_id,
+            'filename': file.filename,
+            'status': 'pending',
+            'total_rows': None,
+            'processed_rows': 0,
+            'rows_per_second': 0,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'elapsed_seconds': None,
+            'errors': []
+        }
+    
+    import_executor.submit(run_import_job, job_id, excel_path)
+    
+    return jsonify({'job_id': job_id, 'message': '导入任务已提交'}), 202
+
+@app.route('/api/import-jobs/<job_id>')
+def get_import_job(job_id):
+    """获取导入任务状态"""
+    with import_jobs_lock:
+        job = import_jobs.get(job_id)
+        job = dict(job, errors=list(job['errors'])) if job else None
+    
+    if job:
+        return jsonify(job)
+    else:
+        return jsonify({'error': '导入任务不存在'}), 404
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     """提供上传文件的访问"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return storage.serve('uploads', filename)
 
 @app.route('/screenshots/<filename>')
 def screenshot_file(filename):
     """提供截图文件的访问"""
-    return send_from_directory('screenshots', filename)
+    return storage.serve('screenshots', filename)
 
 if __name__ == '__main__':
     print("🚀 启动视频审核管理系统...")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件存储 - 上传视频和截图的存储后端
+- local：本地文件系统（默认），文件由 Flask 读写和提供
+- s3：S3兼容对象存储（AWS S3、MinIO 等），客户端通过预签名URL直接上传和下载
+"""
+
+import os
+import shutil
+
+from flask import redirect, send_from_directory
+
+# 可选依赖：使用S3兼容存储时需要安装 boto3
+try:
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+class LocalStorage:
+    """本地文件系统存储：每个分类（uploads / screenshots）对应一个目录"""
+
+    supports_presign = False
+
+    def __init__(self, folders):
+        self.folders = folders
+        for folder in folders.values():
+            os.makedirs(folder, exist_ok=True)
+
+    def path(self, category, filename):
+        return os.path.join(self.folders[category], filename)
+
+    def save(self, category, filename, fileobj, content_type=None):
+        """保存二进制文件对象"""
+        with open(self.path(category, filename), 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+
+    def exists(self, category, filename):
+        return os.path.isfile(self.path(category, filename))
+
+    def delete(self, category, filename):
+        file_path = self.path(category, filename)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def serve(self, category, filename):
+        """由 Flask 直接返回文件"""
+        return send_from_directory(self.folders[category], filename)
+
+class S3Storage:
+    """S3兼容对象存储：对象键为 <分类>/<文件名>"""
+
+    supports_presign = True
+
+    def __init__(self, bucket, endpoint_url=None, region=None, expires=3600):
+        if boto3 is None:
+            raise RuntimeError('使用S3存储需要先安装 boto3')
+        if not bucket:
+            raise RuntimeError('使用S3存储需要配置 S3_BUCKET')
+        self.bucket = bucket
+        self.expires = expires
+        # MinIO 等服务使用路径风格的地址（http://host:port/bucket/key）
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'path'}),
+        )
+
+    def key(self, category, filename):
+        return f"{category}/{filename}"
+
+    def save(self, category, filename, fileobj, content_type=None):
+        """服务端上传（未使用预签名直传时的兼容方式）"""
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, self.bucket, self.key(category, filename), ExtraArgs=extra_args)
+
+    def exists(self, category, filename):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(category, filename))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def delete(self, category, filename):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(category, filename))
+
+    def presign_put(self, category, filename, content_type, expires=None):
+        """生成客户端直接上传用的预签名PUT地址（上传时需带相同的 Content-Type）"""
+        return self.client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': self.bucket, 'Key': self.key(category, filename), 'ContentType': content_type},
+            ExpiresIn=expires or self.expires,
+        )
+
+    def presign_get(self, category, filename, expires=None):
+        """生成客户端直接下载用的预签名GET地址"""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self.key(category, filename)},
+            ExpiresIn=expires or self.expires,
+        )
+
+    def serve(self, category, filename):
+        """重定向到预签名下载地址，文件不经过 Flask"""
+        return redirect(self.presign_get(category, filename))
+
+def create_storage(config):
+    """根据应用配置创建存储后端"""
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 'local':
+        return LocalStorage({
+            'uploads': config['UPLOAD_FOLDER'],
+            'screenshots': config['SCREENSHOT_FOLDER'],
+        })
+    if backend == 's3':
+        return S3Storage(config.get('S3_BUCKET'), config.get('S3_ENDPOINT_URL'), config.get('S3_REGION'),
+                         config.get('PRESIGN_EXPIRES_SECONDS', 3600))
+    raise ValueError(f'不支持的存储后端: {backend}')
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库写队列 - 单独的写线程按批提交写操作（group commit）
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+def is_busy_error(error):
+    """是否为 SQLITE_BUSY / 数据库被锁定错误"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+class WriteRequest:
+    """一次写操作：在写线程中执行 func(conn)，调用方等待提交结果"""
+
+    def __init__(self, func):
+        self.func = func
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.lock = threading.Lock()
+        self.started = False  # 写线程已开始执行（之后只能等待批次结束）
+        self.cancelled = False  # 调用方已超时放弃，写线程跳过
+
+    def start(self):
+        """写线程执行前调用；已取消时返回 False"""
+        with self.lock:
+            if not self.cancelled:
+                self.started = True
+            return self.started
+
+    def cancel(self):
+        """调用方超时时调用；写线程已开始执行时无法取消，返回 False"""
+        with self.lock:
+            if not self.started:
+                self.cancelled = True
+            return self.cancelled
+
+class WriteQueue:
+    """
+    所有写操作交给同一个写线程执行：
+    - 在 max_delay 秒内最多攒 max_batch 个写操作，放在一个事务里一次提交
+    - 每个写操作使用独立的 SAVEPOINT，单个失败不影响同批其他写操作
+    - BEGIN/COMMIT 遇到 SQLITE_BUSY 时按指数退避重试
+    - submit() 在所属批次提交成功后才返回
+    """
+
+    def __init__(self, db_file, max_batch=64, max_delay=0.01, busy_retries=8):
+        self.db_file = db_file
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.busy_retries = busy_retries
+        self.requests = queue.Queue()
+        self.thread = None
+        self.start_lock = threading.Lock()
+
+    def submit(self, func, timeout=30):
+        """
+        提交写操作并等待提交完成，返回 func 的返回值；失败时抛出对应异常
+        超时时若写操作尚未开始执行则取消并抛出 TimeoutError（保证不会在之后提交），
+        已开始执行则等待所属批次结束，以实际结果为准
+        """
+        self._ensure_started()
+        request = WriteRequest(func)
+        self.requests.put(request)
+        if not request.done.wait(timeout):
+            if request.cancel():
+                raise TimeoutError('数据库写入超时')
+            request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _ensure_started(self):
+        """首次使用时启动写线程（避免调试模式重载时在父进程中启动）"""
+        if self.thread is not None:
+            return
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self.thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=1, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.isolation_level = None  # 手动控制事务
+        # WAL 模式下读不阻塞写；synchronous=NORMAL 每次提交不再强制 fsync 主库文件
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception as e:
+                    self._finish(batch, e)
+                    continue
+            self._commit_batch(conn, batch)
+
+    def _execute_with_retry(self, conn, statement):
+        """执行 BEGIN/COMMIT，遇到 SQLITE_BUSY 时退避重试"""
+        delay = 0.005
+        for attempt in range(self.busy_retries):
+            try:
+                return conn.execute(statement)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == self.busy_retries - 1:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+
+    def _commit_batch(self, conn, batch):
+        try:
+            self._execute_with_retry(conn, 'BEGIN IMMEDIATE')
+            for request in batch:
+                if not request.start():
+                    continue
+                conn.execute('SAVEPOINT write_request')
+                try:
+                    request.result = request.func(conn)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write_request')
+                    request.error = e
+                conn.execute('RELEASE write_request')
+            self._execute_with_retry(conn, 'COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            self._finish(batch, e)
+            return
+
+        self._finish(batch)
+
+    def _finish(self, batch, error=None):
+        """通知调用方；error 不为空表示整批失败"""
+        for request in batch:
+            if error is not None:
+                request.error = error
+            request.done.set()